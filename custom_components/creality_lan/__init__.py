@@ -3,21 +3,70 @@ from __future__ import annotations
 import logging
 from homeassistant.core import HomeAssistant
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers.device_registry import DeviceInfo, CONNECTION_NETWORK_MAC
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 
-from .const import DOMAIN
+from .const import (
+    CONF_CFS_POLL_FAST,
+    CONF_CFS_POLL_SLOW,
+    DEFAULT_CFS_POLL_FAST,
+    DEFAULT_CFS_POLL_SLOW,
+    DOMAIN,
+)
+from .dispatcher import EntityDispatcher
 from .ws import CrealityWS
 
 PLATFORMS: list[str] = ["sensor", "binary_sensor", "switch", "camera"]
 _LOGGER = logging.getLogger(__name__)
 
 
+async def _async_device_info(client: CrealityWS, entry: ConfigEntry, urls: dict) -> DeviceInfo:
+    """Fetch /info and build the DeviceInfo shared by every printer entity."""
+    await client.async_fetch_info()
+    return DeviceInfo(
+        identifiers={(DOMAIN, client.unique_id)},
+        connections={(CONNECTION_NETWORK_MAC, client.mac)} if client.mac else None,
+        manufacturer="Creality",
+        model=client.model or "Creality Printer",
+        name=entry.title,
+        configuration_url=urls["configuration"],
+    )
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     host = entry.data["host"]
 
-    client = CrealityWS(host)
+    client = CrealityWS(
+        host,
+        cfs_poll_fast=entry.options.get(CONF_CFS_POLL_FAST, DEFAULT_CFS_POLL_FAST),
+        cfs_poll_slow=entry.options.get(CONF_CFS_POLL_SLOW, DEFAULT_CFS_POLL_SLOW),
+    )
+
+    # Per-host URLs, resolved once and shared by the platforms
+    urls = {
+        "configuration": f"http://{host}:80",
+        # Preferred (old) MJPEG URL first; the rest are fallbacks
+        "mjpeg_candidates": [
+            f"http://{host}:8080/?action=stream",
+            f"http://{host}:8000/?action=stream",
+            f"http://{host}/webcam/?action=stream",
+            f"http://{host}:80/webcam/?action=stream",
+        ],
+        "snapshot_candidates": [
+            f"http://{host}:8080/?action=snapshot",
+            f"http://{host}:8000/webcam?action=snapshot",
+            f"http://{host}:8000/?action=snapshot",
+            f"http://{host}/webcam?action=snapshot",
+        ],
+    }
+
+    # One client listener for all entities instead of one per entity
+    dispatcher = EntityDispatcher()
+    client.add_listener(dispatcher.dispatch)
+
     await client.async_start()
-    await client.async_fetch_info()  # model/mac for device registry
+    # /info (model/mac) runs while the platforms load; they await it for DeviceInfo
+    info_task = hass.async_create_task(_async_device_info(client, entry, urls))
 
     coordinator = DataUpdateCoordinator(
         hass,
@@ -31,13 +80,23 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         "client": client,
         "coordinator": coordinator,
         "entry": entry,
+        "info_task": info_task,
+        "dispatcher": dispatcher,
+        "urls": urls,
     }
 
+    entry.async_on_unload(entry.add_update_listener(_async_options_updated))
+
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     return True
 
 
+async def _async_options_updated(hass: HomeAssistant, entry: ConfigEntry):
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     data = hass.data[DOMAIN].pop(entry.entry_id)
+    data["info_task"].cancel()  # no-op once finished
     await data["client"].async_stop()
     return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
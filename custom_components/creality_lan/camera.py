@@ -1,181 +1,366 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import io
+import logging
+import time
 from typing import Optional
 
 import aiohttp
 from homeassistant.components.camera import Camera
-from homeassistant.helpers.device_registry import DeviceInfo, CONNECTION_NETWORK_MAC
+from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
 from .const import DOMAIN
 
+_LOGGER = logging.getLogger(__name__)
 
-async def async_setup_entry(hass, entry, async_add_entities):
-    data = hass.data[DOMAIN][entry.entry_id]
-    client = data["client"]
-    entry_obj = data["entry"]
-
-    device_info = DeviceInfo(
-        identifiers={(DOMAIN, client.unique_id)},
-        connections={(CONNECTION_NETWORK_MAC, client.mac)} if client.mac else None,
-        manufacturer="Creality",
-        model=client.model or "Creality Printer",
-        name=entry_obj.title,
-        configuration_url=f"http://{entry_obj.data['host']}:80",
-    )
-
-    class CrealityWebcam(Camera):
-        """Camera entity that grabs a single JPEG frame from the printer."""
-
-        _attr_name = "Webcam"
-        _attr_has_entity_name = True
-        _attr_unique_id = f"{client.unique_id}_webcam"
-
-        def __init__(self, host: str):
-            super().__init__()
-            self._host = host
-            # Preferred (old) stream URL – we keep this if it works
-            self._mjpeg_url = f"http://{host}:8080/?action=stream"
-            self._session: aiohttp.ClientSession | None = None
-
-            # Fallbacks to probe (in this order) only if the preferred one fails
-            self._mjpeg_candidates = [
-                f"http://{host}:8080/?action=stream",   # keep if working
-                f"http://{host}:8000/?action=stream",   # alt port
-                f"http://{host}/webcam/?action=stream", # no port, /webcam path
-                f"http://{host}:80/webcam/?action=stream",
-            ]
+# Long-lived stream: bound connect/idle time, not the total duration
+_STREAM_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=5, sock_read=10)
+_READER_RETRY_SEC = 5
+# How long a request may wait for the reader's first frame (baseline stream timeout)
+_FIRST_FRAME_TIMEOUT = 5
+# While no verified endpoint answers, probe all candidates again at most this often
+_REPROBE_SEC = 30
+# Webcam frames are typically 50-300 KB; large reads keep Python round-trips low
+_READ_CHUNK = 64 * 1024
+# Safety cap for a frame whose EOI never arrives
+_MAX_FRAME_BYTES = 2_000_000
+# Probes: bound connect and read separately so warm keep-alive sockets stay pooled
+_PROBE_TIMEOUT = aiohttp.ClientTimeout(sock_connect=0.5, sock_read=1.5)
+_PROBE_HEADERS = {"Connection": "keep-alive"}
+
+
+class _JpegScanner:
+    """Streaming JPEG extractor tracking SOI/EOI markers across chunks.
+
+    Same state machine as ffmpeg's mjpeg parser (outside a frame look for
+    SOI FFD8, inside look for EOI FFD9), but markers are located with
+    bytes.find so the scan runs in C instead of a per-byte Python loop.
+    Nested SOI/EOI pairs (EXIF/JFIF thumbnails) are counted so a frame ends
+    at its own EOI. A part boundary inside a frame, or a frame growing past
+    _MAX_FRAME_BYTES, drops the frame and resyncs on the next SOI.
+    """
+
+    _SOI = b"\xff\xd8"
+    _EOI = b"\xff\xd9"
+
+    def __init__(self, boundary: bytes) -> None:
+        self._boundary = boundary  # b"--<boundary>" separating multipart parts
+        self._tail = b""  # end of the previous chunk, for boundaries split across chunks
+        self._tail_ff = False  # previous chunk ended with 0xFF
+        self._frame: io.BytesIO | None = None  # JPEG being collected
+        self._depth = 0  # SOIs not yet matched by an EOI within the frame
+
+    @classmethod
+    def _new_frame(cls) -> io.BytesIO:
+        frame = io.BytesIO()
+        frame.write(cls._SOI)
+        return frame
+
+    def feed(self, chunk: bytes) -> bytes | None:
+        """Consume a chunk; return the last JPEG completed within it, if any."""
+        frame = self._frame
+        depth = self._depth
+        boundary = self._boundary
+        blen = len(boundary)
+        view = memoryview(chunk)
+        start = 0
+        pos = 0
+        done = None
+
+        # Boundary split across the chunk boundary: the part ended without EOI
+        if frame is not None and self._tail:
+            idx = (self._tail + chunk[: blen - 1]).find(boundary)
+            if idx != -1:
+                frame = None
+                pos = idx + blen - len(self._tail)
 
-            # Snapshot endpoints (used as a last-resort single-frame fetch)
-            self._snapshot_candidates = [
-                f"http://{host}:8080/?action=snapshot",
-                f"http://{host}:8000/webcam?action=snapshot",
-                f"http://{host}:8000/?action=snapshot",
-                f"http://{host}/webcam?action=snapshot",
+        # Marker split across the chunk boundary
+        if self._tail_ff and chunk and pos == 0:
+            if chunk[0] == 0xD8:
+                if frame is None:
+                    frame = self._new_frame()
+                    depth = 1
+                    start = 1
+                else:
+                    depth += 1
+                pos = 1
+            elif frame is not None and chunk[0] == 0xD9:
+                depth -= 1
+                pos = 1
+                if depth == 0:
+                    frame.write(view[:1])
+                    done = frame.getvalue()
+                    frame = None
+
+        while True:
+            if frame is None:
+                idx = chunk.find(self._SOI, pos)
+                if idx == -1:
+                    break
+                frame = self._new_frame()
+                depth = 1
+                start = pos = idx + 2
+                continue
+            # Nearest of EOI, nested SOI or part boundary
+            hits = [
+                (i, kind)
+                for i, kind in (
+                    (chunk.find(self._EOI, pos), "eoi"),
+                    (chunk.find(self._SOI, pos), "soi"),
+                    (chunk.find(boundary, pos), "boundary"),
+                )
+                if i != -1
             ]
+            if not hits:
+                frame.write(view[start:])
+                break
+            idx, kind = min(hits)
+            if kind == "boundary":
+                frame = None  # truncated part: drop it
+                pos = idx + blen
+            elif kind == "soi":
+                depth += 1
+                pos = idx + 2
+            else:
+                depth -= 1
+                pos = idx + 2
+                if depth == 0:
+                    frame.write(view[start:pos])
+                    done = frame.getvalue()
+                    frame = None
 
-        @property
-        def device_info(self) -> DeviceInfo:
-            return device_info
-
-        async def async_added_to_hass(self) -> None:
-            # Reuse HA's shared session
-            self._session = async_get_clientsession(self.hass)
-            # Probe and keep the original URL if it works; otherwise pick the first working fallback
-            selected = await self._select_stream_url()
-            if selected:
-                self._mjpeg_url = selected
-
-        async def _probe_url(self, url: str, *, bytes_to_read: int = 64) -> bool:
-            """Return True if the URL looks like a live MJPEG stream."""
-            assert self._session is not None
-            try:
-                timeout = aiohttp.ClientTimeout(total=2)
-                async with self._session.get(url, timeout=timeout) as resp:
-                    if resp.status != 200:
-                        return False
-                    ctype = (resp.headers.get("Content-Type") or "").lower()
-                    if "multipart/x-mixed-replace" in ctype or "mjpeg" in ctype:
-                        return True
-                    # Peek a small chunk: boundary or JPEG SOI is a good hint
-                    chunk = await resp.content.read(bytes_to_read)
-                    return chunk.startswith(b"--") or b"\xff\xd8" in chunk
-            except asyncio.TimeoutError:
-                return False
-            except Exception:
-                return False
-
-        async def _select_stream_url(self) -> Optional[str]:
-            """Keep the first (old) URL if it works; otherwise choose the first working fallback."""
-            # First check the currently set (old) URL
-            if await self._probe_url(self._mjpeg_candidates[0]):
-                return self._mjpeg_candidates[0]
-            # Try fallbacks
-            for url in self._mjpeg_candidates[1:]:
-                if await self._probe_url(url):
+        if frame is not None and frame.tell() > _MAX_FRAME_BYTES:
+            frame = None  # no EOI in sight; resync on the next SOI
+
+        self._tail_ff = chunk.endswith(b"\xff")
+        # Slice before joining so only ~len(boundary) bytes are copied, not the chunk
+        self._tail = (self._tail + chunk[-(blen - 1):])[-(blen - 1):] if blen > 1 else b""
+        self._frame = frame
+        self._depth = depth
+        return done
+
+
+class CrealityWebcam(Camera):
+    """Camera entity serving the latest JPEG frame from the printer's MJPEG stream."""
+
+    _attr_name = "Webcam"
+    _attr_has_entity_name = True
+
+    def __init__(self, client, device_info: DeviceInfo, urls: dict):
+        super().__init__()
+        self._attr_device_info = device_info
+        self._attr_unique_id = f"{client.unique_id}_webcam"
+        # Preferred (old) stream URL – we keep this if it works
+        self._mjpeg_url = urls["mjpeg_candidates"][0]
+        self._session: aiohttp.ClientSession | None = None
+        self._reader_task: asyncio.Task | None = None
+        self._last_frame: bytes | None = None
+        self._frame_ready = asyncio.Event()  # set while _last_frame holds a frame
+        self._stream_verified = False  # _mjpeg_url answered a probe at least once
+        self._next_probe = 0.0  # monotonic time the candidates may be probed again
+
+        # Fallbacks to probe (in this order) only if the preferred one fails
+        self._mjpeg_candidates: list[str] = urls["mjpeg_candidates"]
+
+        # Snapshot endpoints (a plain JPEG GET is preferred over MJPEG parsing)
+        self._snapshot_url: str | None = None
+        self._snapshot_candidates: list[str] = urls["snapshot_candidates"]
+
+    async def async_added_to_hass(self) -> None:
+        # Reuse HA's shared session
+        self._session = async_get_clientsession(self.hass)
+        await self._probe_endpoints()
+
+    async def _probe_endpoints(self) -> None:
+        """Select the stream and snapshot URLs; run the reader only if the stream alone works."""
+        # Probe and keep the original URL if it works; otherwise pick the first working fallback
+        selected, self._snapshot_url = await asyncio.gather(
+            self._select_stream_url(), self._select_snapshot_url()
+        )
+        if selected:
+            self._mjpeg_url = selected
+            self._stream_verified = True
+        if self._stream_verified and not self._snapshot_url:
+            self._start_reader()
+        self._next_probe = time.monotonic() + _REPROBE_SEC
+
+    def _start_reader(self) -> None:
+        """Keep one MJPEG connection open instead of reopening it per snapshot."""
+        if self._reader_task and not self._reader_task.done():
+            return
+        self._reader_task = self.hass.async_create_background_task(
+            self._mjpeg_reader(), name=f"{DOMAIN} webcam {self._attr_unique_id}"
+        )
+
+    async def _probe_url(self, url: str, *, bytes_to_read: int = 64) -> bool:
+        """Return True if the URL looks like a live MJPEG stream."""
+        assert self._session is not None
+        # HEAD first: the server answers with headers only and skips encoding a frame
+        try:
+            async with self._session.head(
+                url, timeout=_PROBE_TIMEOUT, headers=_PROBE_HEADERS, allow_redirects=True
+            ) as resp:
+                if resp.status == 404:
+                    return False
+                ctype = (resp.headers.get("Content-Type") or "").lower()
+                if resp.status == 200 and (
+                    "multipart/x-mixed-replace" in ctype or "mjpeg" in ctype
+                ):
+                    return True
+        except Exception:
+            pass  # servers without HEAD support may just drop the connection
+        # Fall back to GET (405/501, unhelpful Content-Type, HEAD errors)
+        try:
+            async with self._session.get(
+                url, timeout=_PROBE_TIMEOUT, headers=_PROBE_HEADERS
+            ) as resp:
+                if resp.status != 200:
+                    return False
+                ctype = (resp.headers.get("Content-Type") or "").lower()
+                if "multipart/x-mixed-replace" in ctype or "mjpeg" in ctype:
+                    return True
+                # Peek a small chunk: boundary or JPEG SOI is a good hint
+                chunk = await resp.content.read(bytes_to_read)
+                return chunk.startswith(b"--") or b"\xff\xd8" in chunk
+        except asyncio.TimeoutError:
+            return False
+        except Exception:
+            return False
+
+    @staticmethod
+    async def _first_working(urls: list[str], check) -> Optional[str]:
+        """Return the first URL, in list order, for which check(url) is truthy."""
+        # Probe all candidates at once, then take results in preference order:
+        # worst case is one probe timeout instead of the sum of all of them
+        probes = [asyncio.create_task(check(url)) for url in urls]
+        try:
+            for url, probe in zip(urls, probes):
+                if await probe:
                     return url
-            return None  # none worked; we'll rely on snapshot later
-
-        async def async_camera_image(
-            self, width: Optional[int] = None, height: Optional[int] = None
-        ) -> bytes | None:
-            """Return one JPEG frame."""
-            assert self._session is not None
-            # First try to extract a frame from MJPEG
-            if self._mjpeg_url:
-                try:
-                    timeout = aiohttp.ClientTimeout(total=5)
-                    async with self._session.get(self._mjpeg_url, timeout=timeout) as resp:
-                        ctype = resp.headers.get("Content-Type", "")
-                        boundary = None
-                        if "boundary=" in ctype:
-                            boundary = ctype.split("boundary=", 1)[1].strip().strip('"')
-                        if not boundary:
-                            boundary = "boundary"
-                        boundary_bytes = ("--" + boundary).encode()
-
-                        reader = resp.content
-                        max_bytes = 2_000_000
-                        start_marker = b"\xff\xd8"
-                        end_marker = b"\xff\xd9"
-
-                        # Skip to first boundary
-                        while True:
-                            line = await reader.readline()
-                            if not line:
-                                break
-                            if boundary_bytes in line:
-                                break
-
-                        # Read first part
-                        while True:
-                            # headers
-                            while True:
-                                line = await reader.readline()
-                                if not line:
-                                    break
-                                if line.strip() == b"":
-                                    break
-                            buf = bytearray()
-                            while True:
-                                chunk = await reader.read(4096)
-                                if not chunk:
-                                    break
-                                bpos = chunk.find(boundary_bytes)
-                                if bpos != -1:
-                                    buf.extend(chunk[:bpos])
-                                    break
-                                buf.extend(chunk)
-                                if len(buf) > max_bytes:
-                                    break
-
-                            sidx = buf.find(start_marker)
-                            eidx = buf.rfind(end_marker)
-                            if sidx != -1 and eidx != -1 and eidx > sidx:
-                                return bytes(buf[sidx : eidx + 2])
-
-                            # consume CRLF after boundary and try next part
-                            await reader.readline()
-                            await reader.readline()
-                except Exception:
-                    pass  # fall back to snapshots next
-
-            # Fallback: try direct snapshot endpoints
-            for url in self._snapshot_candidates:
-                try:
-                    timeout = aiohttp.ClientTimeout(total=3)
-                    async with self._session.get(url, timeout=timeout) as resp:
-                        if resp.status == 200:
-                            data = await resp.read()
-                            if data.startswith(b"\xff\xd8"):
-                                return data
-                except Exception:
-                    continue
-
-            return None  # nothing worked
-
-        async def stream_source(self):
-            return self._mjpeg_url
-
-    async_add_entities([CrealityWebcam(entry_obj.data["host"])])
+            return None
+        finally:
+            for probe in probes:
+                probe.cancel()
+
+    async def _select_stream_url(self) -> Optional[str]:
+        """Keep the first (old) URL if it works; otherwise choose the first working fallback."""
+        # None means nothing worked; we'll rely on snapshot later
+        return await self._first_working(self._mjpeg_candidates, self._probe_url)
+
+    async def _get_snapshot(self, url: str) -> tuple[bytes | None, int | None]:
+        """Return (JPEG or None, HTTP status or None if the request failed)."""
+        assert self._session is not None
+        try:
+            timeout = aiohttp.ClientTimeout(total=3)
+            async with self._session.get(url, timeout=timeout) as resp:
+                if resp.status == 200:
+                    data = await resp.read()
+                    if data.startswith(b"\xff\xd8"):
+                        return data, resp.status
+                return None, resp.status
+        except Exception:
+            return None, None
+
+    async def _fetch_snapshot(self, url: str) -> bytes | None:
+        """Return the JPEG served by a snapshot endpoint, or None."""
+        data, _ = await self._get_snapshot(url)
+        return data
+
+    async def _select_snapshot_url(self) -> Optional[str]:
+        """Return the first snapshot endpoint that serves a JPEG."""
+        return await self._first_working(self._snapshot_candidates, self._fetch_snapshot)
+
+    async def async_will_remove_from_hass(self) -> None:
+        if self._reader_task:
+            self._reader_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._reader_task
+            self._reader_task = None
+
+    async def _mjpeg_reader(self) -> None:
+        """Keep the MJPEG stream open and remember the latest frame."""
+        while True:
+            try:
+                await self._read_stream()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                _LOGGER.debug("MJPEG stream %s failed: %s", self._mjpeg_url, e)
+            self._last_frame = None
+            self._frame_ready.clear()
+            await asyncio.sleep(_READER_RETRY_SEC)
+
+    async def _read_stream(self) -> None:
+        """Read parts from the stream until it closes, storing each JPEG found."""
+        assert self._session is not None
+        async with self._session.get(self._mjpeg_url, timeout=_STREAM_TIMEOUT) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"HTTP {resp.status}")
+            ctype = resp.headers.get("Content-Type", "")
+            boundary = None
+            if "boundary=" in ctype:
+                boundary = ctype.split("boundary=", 1)[1].strip().strip('"')
+            if not boundary:
+                boundary = "boundary"
+
+            reader = resp.content
+
+            # Part headers never contain SOI, so the scanner skips them itself;
+            # it only uses the boundary to drop parts that end without EOI
+            scanner = _JpegScanner(("--" + boundary).encode())
+            while True:
+                chunk = await reader.read(_READ_CHUNK)
+                if not chunk:
+                    return
+                frame = scanner.feed(chunk)
+                if frame is not None:
+                    self._last_frame = frame
+                    self._frame_ready.set()
+
+    async def async_camera_image(
+        self, width: Optional[int] = None, height: Optional[int] = None
+    ) -> bytes | None:
+        """Return one JPEG frame."""
+        # Single JPEG GET when the firmware offers a snapshot endpoint
+        if self._snapshot_url:
+            data, status = await self._get_snapshot(self._snapshot_url)
+            if data:
+                return data
+            if status == 404:
+                # Endpoint is gone; the MJPEG stream takes over from now on
+                _LOGGER.debug("Snapshot %s returned 404; switching to MJPEG", self._snapshot_url)
+                self._snapshot_url = None
+                if self._stream_verified:
+                    self._start_reader()
+            # Timeouts and other errors are transient: keep the URL for the next call
+
+        # Latest frame from the background MJPEG reader; right after (re)connecting
+        # wait briefly for the first one rather than returning nothing
+        if self._stream_verified and not self._snapshot_url:
+            self._start_reader()
+            if self._last_frame is None:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._frame_ready.wait(), _FIRST_FRAME_TIMEOUT)
+            if self._last_frame is not None:
+                return self._last_frame
+
+        # Nothing verified answered (printer busy, rebooting or off at startup):
+        # probe every candidate again, as the baseline did, but only after a backoff
+        if time.monotonic() >= self._next_probe:
+            await self._probe_endpoints()
+            if self._snapshot_url:
+                return await self._fetch_snapshot(self._snapshot_url)
+        return self._last_frame
+
+    async def stream_source(self):
+        return self._mjpeg_url
+
+
+async def async_setup_entry(hass, entry, async_add_entities):
+    data = hass.data[DOMAIN][entry.entry_id]
+    client = data["client"]
+    device_info = await data["info_task"]  # also settles client.unique_id
+    async_add_entities([CrealityWebcam(client, device_info, data["urls"])])
@@ -3,25 +3,43 @@ from __future__ import annotations
 import aiohttp
 import voluptuous as vol
 from homeassistant import config_entries
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
-from .const import DOMAIN, DEFAULT_PORT_HTTP
+from .const import (
+    CONF_CFS_POLL_FAST,
+    CONF_CFS_POLL_SLOW,
+    DEFAULT_CFS_POLL_FAST,
+    DEFAULT_CFS_POLL_SLOW,
+    DEFAULT_PORT_HTTP,
+    DOMAIN,
+)
 
 
 class CrealityFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        return CrealityOptionsFlow(config_entry)
+
     async def async_step_user(self, user_input=None) -> FlowResult:
         errors: dict[str, str] = {}
 
         if user_input:
             ip = user_input["host"].strip()
             try:
-                async with aiohttp.ClientSession() as s:
-                    async with s.get(f"http://{ip}:{DEFAULT_PORT_HTTP}/info", timeout=6) as r:
-                        if r.status != 200:
-                            raise RuntimeError(f"HTTP {r.status}")
-                        data = await r.json()
+                # Reuse HA's shared session (pooled keep-alive connector)
+                session = async_get_clientsession(self.hass)
+                async with session.get(
+                    f"http://{ip}:{DEFAULT_PORT_HTTP}/info",
+                    timeout=aiohttp.ClientTimeout(connect=2, total=6),
+                ) as r:
+                    if r.status != 200:
+                        raise RuntimeError(f"HTTP {r.status}")
+                    data = await r.json()
 
                 unique_id = (data.get("mac") or ip).lower()
                 await self.async_set_unique_id(unique_id)
@@ -35,3 +53,32 @@ class CrealityFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         schema = vol.Schema({vol.Required("host"): str})
         return self.async_show_form(step_id="user", data_schema=schema, errors=errors)
+
+
+class CrealityOptionsFlow(config_entries.OptionsFlow):
+    """CFS polling intervals (seconds)."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        self._entry = config_entry
+
+    async def async_step_init(self, user_input=None) -> FlowResult:
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            if user_input[CONF_CFS_POLL_FAST] <= user_input[CONF_CFS_POLL_SLOW]:
+                return self.async_create_entry(title="", data=user_input)
+            errors[CONF_CFS_POLL_FAST] = "fast_exceeds_slow"
+
+        # Re-show the user's values after an error, otherwise the saved options
+        values = user_input or self._entry.options
+        interval = vol.All(vol.Coerce(int), vol.Range(min=5, max=3600))
+        schema = vol.Schema(
+            {
+                vol.Required(
+                    CONF_CFS_POLL_FAST, default=values.get(CONF_CFS_POLL_FAST, DEFAULT_CFS_POLL_FAST)
+                ): interval,
+                vol.Required(
+                    CONF_CFS_POLL_SLOW, default=values.get(CONF_CFS_POLL_SLOW, DEFAULT_CFS_POLL_SLOW)
+                ): interval,
+            }
+        )
+        return self.async_show_form(step_id="init", data_schema=schema, errors=errors)
@@ -5,18 +5,37 @@ DEFAULT_PORT_HTTP = 80  # used by /info and snapshot
 HEARTBEAT_SEC = 10
 RECONNECT_BACKOFF = [1, 2, 5, 10, 20, 30]
 
+# CFS boxsInfo polling: fast while boxes recently changed, slow otherwise (options)
+CONF_CFS_POLL_FAST = "cfs_poll_fast"
+CONF_CFS_POLL_SLOW = "cfs_poll_slow"
+DEFAULT_CFS_POLL_FAST = 20
+DEFAULT_CFS_POLL_SLOW = 60
+CFS_CHANGE_WINDOW_SEC = 120
+
 # Printer state mapping (from your slicer snippet)
 # 0=IDLE, 1=PRINTING, 2=COMPLETE, 3=FAILED, 4=ABORT, 5=PAUSED, 6=PAUSING, 7=STOPPING, 8=RESTORING
-STATE_MAP = {
-    None: "unknown",
-    -1: "offline",
-    0: "idle",
-    1: "printing",
-    2: "complete",
-    3: "failed",
-    4: "abort",
-    5: "paused",
-    6: "pausing",
-    7: "stopping",
-    8: "restoring",
-}
+# Indexed by state code; -1 (offline) and None/out-of-range (unknown) are handled in state_name()
+STATE_NAMES = (
+    "idle",
+    "printing",
+    "complete",
+    "failed",
+    "abort",
+    "paused",
+    "pausing",
+    "stopping",
+    "restoring",
+)
+
+
+def state_name(state) -> str:
+    """Translate a printer state code into its name."""
+    if state is None:
+        return "unknown"
+    if isinstance(state, float) and state.is_integer():
+        state = int(state)  # 1.0 is "printing", as in ws._set_state
+    if state == -1:
+        return "offline"
+    if isinstance(state, int) and 0 <= state < len(STATE_NAMES):
+        return STATE_NAMES[state]
+    return "unknown"
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import logging
+from typing import Callable
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Registry:
+    """Copy-on-write collection for callbacks or entities.
+
+    ``items`` is an immutable tuple rebuilt on add/remove, so iterating it
+    during a fan-out stays safe while members come and go.
+    """
+
+    def __init__(self) -> None:
+        self.items: tuple = ()
+
+    def add(self, item) -> Callable[[], None]:
+        """Register an item; returns a function that removes it."""
+        self.items = self.items + (item,)
+
+        def _remove() -> None:
+            self.items = tuple(x for x in self.items if x is not item)
+
+        return _remove
+
+
+class EntityDispatcher:
+    """Single client listener that fans a state change out to every registered entity.
+
+    Entities implement ``_handle_client_update()`` and decide for themselves
+    whether anything changed enough to write state.
+    """
+
+    def __init__(self) -> None:
+        self._entities = Registry()
+
+    def add(self, entity) -> Callable[[], None]:
+        """Register an entity; returns a function that removes it."""
+        return self._entities.add(entity)
+
+    def dispatch(self) -> None:
+        for entity in self._entities.items:
+            try:
+                entity._handle_client_update()
+            except Exception:
+                _LOGGER.debug("Update of %s failed", entity, exc_info=True)
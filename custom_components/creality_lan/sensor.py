@@ -1,29 +1,22 @@
 # /config/custom_components/creality_lan/sensor.py
 from __future__ import annotations
 
-from typing import Optional, Dict, Any, List
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, Dict, Any, List
 
 from homeassistant.components.sensor import SensorEntity, SensorDeviceClass
 from homeassistant.const import UnitOfTemperature, UnitOfTime, PERCENTAGE
-from homeassistant.helpers.device_registry import DeviceInfo, CONNECTION_NETWORK_MAC
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.event import async_call_later
 
-from .const import DOMAIN, STATE_MAP
+from .const import DOMAIN, state_name
 
 
 # ----------------- Helpers -----------------
 
-def _printer_device_info(entry_obj, client) -> DeviceInfo:
-    return DeviceInfo(
-        identifiers={(DOMAIN, client.unique_id)},
-        connections={(CONNECTION_NETWORK_MAC, client.mac)} if client.mac else None,
-        manufacturer="Creality",
-        model=client.model or "Creality Printer",
-        name=entry_obj.title,
-        configuration_url=f"http://{entry_obj.data['host']}:80",
-    )
-
-
-def _cfs_device_info(entry_obj, client, box_id: int) -> DeviceInfo:
+def _cfs_device_info(entry_obj, client, urls, box_id: int) -> DeviceInfo:
     # One device per CFS (type==0) box
     return DeviceInfo(
         identifiers={(DOMAIN, f"{client.unique_id}_cfs_{box_id}")},
@@ -31,42 +24,241 @@ def _cfs_device_info(entry_obj, client, box_id: int) -> DeviceInfo:
         model="CFS / Material Box",
         name=f"{entry_obj.title} CFS {box_id}",
         via_device=(DOMAIN, client.unique_id),
-        configuration_url=f"http://{entry_obj.data['host']}:80",
+        configuration_url=urls["configuration"],
     )
 
 
 def _cfs_boxes(state: Dict[str, Any]) -> List[Dict[str, Any]]:
-    info = state.get("boxsInfo") or {}
-    boxes = info.get("materialBoxs", []) or []
-    # Only “real” CFS boxes: type == 0
-    return [b for b in boxes if b.get("type") == 0]
+    # Only “real” CFS boxes (type == 0), indexed by CrealityWS on ingest
+    return list(state["_box_index"].values())
 
 
 def _cfs_box(state: Dict[str, Any], box_id: int) -> Optional[Dict[str, Any]]:
-    for b in _cfs_boxes(state):
-        if b.get("id") == box_id:
-            return b
-    return None
+    return state["_box_index"].get(box_id)
 
 
 def _slot(box: Dict[str, Any], slot_id: int) -> Optional[Dict[str, Any]]:
-    for m in box.get("materials", []) or []:
-        if m.get("id") == slot_id:
-            return m
-    return None
-
-
-def _norm_color(c: Optional[str]) -> Optional[str]:
-    if not c:
-        return None
-    # Normalize things like "0ffffff", "0000000", "#09ea7ae" → "#ffffff" style 7-chars is odd, but we’ll best-effort.
-    s = str(c).strip()
-    if s.startswith("#"):
-        return s
-    # If it looks like 7 chars starting with 0, keep it but add "#"
-    if len(s) in (6, 7, 8):
-        return "#" + s[-6:]
-    return s
+    return box["_slot_index"].get(slot_id)
+
+
+# ----------------- Throttled push base -----------------
+
+# Minimum seconds between state writes per printer sensor key (default below)
+_PRINTER_THROTTLE_SEC = {
+    "nozzle_temp": 1.0,
+    "bed_temp": 1.0,
+    "chamber_temp": 1.0,
+    "progress": 2.0,
+    "time_left": 2.0,
+    "job_time": 2.0,
+    "file": 0.0,
+    "state_text": 0.0,
+    "state_code": 0.0,
+}
+_DEFAULT_THROTTLE_SEC = 0.5
+
+
+class _PushSensor(SensorEntity):
+    """Sensor updated from websocket pushes, written only on change and at most every _throttle_sec.
+
+    A change arriving inside the throttle window is written when the window
+    closes, so the final value is never lost.
+    """
+
+    _attr_has_entity_name = True
+    _attr_entity_registry_enabled_default = True
+    _attr_should_poll = False
+    _throttle_sec = _DEFAULT_THROTTLE_SEC
+
+    def __init__(self, client, dispatcher):
+        self._client = client
+        self._dispatcher = dispatcher
+        self._last_push = 0.0
+        self._last_pushed: Any = None
+        self._unsub_trailing: CALLBACK_TYPE | None = None
+
+    async def async_added_to_hass(self) -> None:
+        self.async_on_remove(self._dispatcher.add(self))
+        self.async_on_remove(self._cancel_trailing)
+
+    def _fingerprint(self) -> Any:
+        return (self.native_value, self.extra_state_attributes)
+
+    @callback
+    def _handle_client_update(self) -> None:
+        if self._unsub_trailing is not None:
+            return  # a write is already scheduled for the end of the window
+        fp = self._fingerprint()
+        if fp == self._last_pushed:
+            return
+        wait = self._last_push + self._throttle_sec - time.monotonic()
+        if wait > 0:
+            self._unsub_trailing = async_call_later(self.hass, wait, self._trailing_write)
+            return
+        self._write(fp)
+
+    @callback
+    def _trailing_write(self, _now) -> None:
+        self._unsub_trailing = None
+        fp = self._fingerprint()
+        if fp != self._last_pushed:
+            self._write(fp)
+
+    @callback
+    def _cancel_trailing(self) -> None:
+        if self._unsub_trailing is not None:
+            self._unsub_trailing()
+            self._unsub_trailing = None
+
+    def _write(self, fp: Any) -> None:
+        self._last_pushed = fp
+        self._last_push = time.monotonic()
+        self.async_write_ha_state()
+
+
+# ----------------- Printer sensors -----------------
+
+def _state_text(s: Dict[str, Any]) -> str:
+    if not s.get("online"):
+        return state_name(-1)
+    return state_name(s.get("state"))
+
+
+# key -> value read from client.state (resolved once per entity)
+_PRINTER_ACCESSORS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "nozzle_temp": lambda s: s["temperature"]["nozzle"]["value"],
+    "bed_temp": lambda s: s["temperature"]["bed"]["value"],
+    "chamber_temp": lambda s: s["temperature"]["box"]["value"],
+    "progress": lambda s: s["printProgress"],
+    "time_left": lambda s: int(s["printLeftTime"]),
+    "job_time": lambda s: int(s["printJobTime"]),
+    "file": lambda s: s["printFileName"] or None,
+    "state_text": _state_text,
+    "state_code": lambda s: s.get("state"),
+    "layer": lambda s: s.get("layer"),
+    "total_layer": lambda s: s.get("TotalLayer"),
+}
+
+# (key, name, unit, device_class)
+_PRINTER_SENSORS = (
+    ("nozzle_temp", "Nozzle Temperature", UnitOfTemperature.CELSIUS, SensorDeviceClass.TEMPERATURE),
+    ("bed_temp", "Bed Temperature", UnitOfTemperature.CELSIUS, SensorDeviceClass.TEMPERATURE),
+    ("chamber_temp", "Chamber Temperature", UnitOfTemperature.CELSIUS, SensorDeviceClass.TEMPERATURE),
+    ("progress", "Print Progress", PERCENTAGE, None),
+    ("time_left", "Time Remaining", UnitOfTime.SECONDS, None),
+    ("job_time", "Time Elapsed", UnitOfTime.SECONDS, None),
+    ("file", "Current File", None, None),
+    ("state_text", "State", None, None),
+    ("state_code", "State Code", None, None),
+    ("layer", "Layer", None, None),
+    ("total_layer", "Total Layers", None, None),
+)
+
+
+class PrinterSensor(_PushSensor):
+    def __init__(self, client, dispatcher, device_info: DeviceInfo, key: str, name: str, unit=None, device_class=None):
+        super().__init__(client, dispatcher)
+        self._key = key
+        self._accessor = _PRINTER_ACCESSORS[key]
+        self._throttle_sec = _PRINTER_THROTTLE_SEC.get(key, _DEFAULT_THROTTLE_SEC)
+        self._attr_name = name
+        self._attr_native_unit_of_measurement = unit
+        self._attr_device_class = device_class
+        self._attr_device_info = device_info
+        self._attr_unique_id = f"{client.unique_id}_{key}"
+
+    @property
+    def native_value(self):
+        return self._accessor(self._client.state)
+
+
+# ----------------- CFS sensors -----------------
+
+class _CFSBoxSensor(_PushSensor):
+    """Box-level CFS value (one device per CFS box)."""
+
+    _field: str
+    _uid_suffix: str
+
+    def __init__(self, client, dispatcher, device_info: DeviceInfo, bid: int):
+        super().__init__(client, dispatcher)
+        self._bid = bid
+        self._attr_device_info = device_info
+        self._attr_unique_id = f"{client.unique_id}_cfs_{bid}_{self._uid_suffix}"
+
+    @property
+    def native_value(self):
+        b = _cfs_box(self._client.state, self._bid)
+        return None if not b else b.get(self._field)
+
+
+class CFSTemp(_CFSBoxSensor):
+    _attr_name = "Temperature"
+    _attr_device_class = SensorDeviceClass.TEMPERATURE
+    _attr_native_unit_of_measurement = UnitOfTemperature.CELSIUS
+    _field = "temp"
+    _uid_suffix = "temp"
+
+
+class CFSHumidity(_CFSBoxSensor):
+    _attr_name = "Humidity"
+    _attr_device_class = SensorDeviceClass.HUMIDITY
+    _attr_native_unit_of_measurement = PERCENTAGE
+    _field = "humidity"
+    _uid_suffix = "humidity"
+
+
+@dataclass(frozen=True)
+class _SlotSpec:
+    """One per-slot sensor: which slot field it shows and how."""
+
+    field: str
+    suffix: str
+    unit: Optional[str] = None
+    device_class: Optional[SensorDeviceClass] = None
+    source: Optional[str] = None  # slot dict key to read, if not ``field``
+
+
+_SLOT_SPECS = (
+    _SlotSpec("percent", "Percent", PERCENTAGE),
+    _SlotSpec("type", "Type"),
+    _SlotSpec("name", "Name"),
+    _SlotSpec("color", "Color", source="_color_norm"),  # normalized on ingest
+    _SlotSpec("minTemp", "Min Temp", UnitOfTemperature.CELSIUS, SensorDeviceClass.TEMPERATURE),
+    _SlotSpec("maxTemp", "Max Temp", UnitOfTemperature.CELSIUS, SensorDeviceClass.TEMPERATURE),
+    _SlotSpec("selected", "Selected"),
+    _SlotSpec("state", "State"),
+)
+
+
+class CFSSlotSensor(_PushSensor):
+    """One field of one CFS slot, with the whole slot as attributes."""
+
+    def __init__(self, client, dispatcher, device_info: DeviceInfo, bid: int, sid: int, spec: _SlotSpec):
+        super().__init__(client, dispatcher)
+        self._bid = bid
+        self._sid = sid
+        self._source = spec.source or spec.field
+        self._attr_name = f"Slot {sid} {spec.suffix}"
+        self._attr_unique_id = f"{client.unique_id}_cfs_{bid}_slot_{sid}_{spec.field}"
+        self._attr_native_unit_of_measurement = spec.unit
+        self._attr_device_class = spec.device_class
+        self._attr_device_info = device_info
+
+    def _slot(self) -> Optional[Dict[str, Any]]:
+        b = _cfs_box(self._client.state, self._bid)
+        return _slot(b, self._sid) if b else None
+
+    @property
+    def native_value(self):
+        m = self._slot()
+        return None if not m else m.get(self._source)
+
+    @property
+    def extra_state_attributes(self):
+        # Built once per boxsInfo frame by CrealityWS
+        m = self._slot()
+        return None if not m else m.get("_attrs")
 
 
 # ----------------- Setup -----------------
@@ -75,74 +267,21 @@ async def async_setup_entry(hass, entry, async_add_entities):
     data = hass.data[DOMAIN][entry.entry_id]
     client = data["client"]
     entry_obj = data["entry"]
+    dispatcher = data["dispatcher"]
 
     # ------- PRINTER SENSORS (always added) -------
-    printer_device = _printer_device_info(entry_obj, client)
-
-    class PrinterSensor(SensorEntity):
-        _attr_has_entity_name = True
-        _attr_entity_registry_enabled_default = True
-
-        def __init__(self, key: str, name: str, unit=None, device_class=None):
-            self._key = key
-            self._attr_name = name
-            self._attr_native_unit_of_measurement = unit
-            self._attr_device_class = device_class
-            self._attr_unique_id = f"{client.unique_id}_{key}"
-            client.add_listener(self.schedule_update_ha_state)
-
-        @property
-        def device_info(self) -> DeviceInfo:
-            return printer_device
-
-        @property
-        def native_value(self):
-            s = client.state
-            if self._key == "nozzle_temp":
-                return s["temperature"]["nozzle"]["value"]
-            if self._key == "bed_temp":
-                return s["temperature"]["bed"]["value"]
-            if self._key == "chamber_temp":
-                return s["temperature"]["box"]["value"]
-            if self._key == "progress":
-                return s["printProgress"]
-            if self._key == "time_left":
-                return int(s["printLeftTime"])
-            if self._key == "job_time":
-                return int(s["printJobTime"])
-            if self._key == "file":
-                return s["printFileName"] or None
-            if self._key == "state_text":
-                if not s.get("online"):
-                    return STATE_MAP.get(-1, "offline")
-                return STATE_MAP.get(s.get("state"), "unknown")
-            if self._key == "state_code":
-                return s.get("state")
-            if self._key == "layer":
-                return s.get("layer")
-            if self._key == "total_layer":
-                return s.get("TotalLayer")
-            return None
+    printer_device = await data["info_task"]
 
     printer_entities = [
-        PrinterSensor("nozzle_temp", "Nozzle Temperature", UnitOfTemperature.CELSIUS, SensorDeviceClass.TEMPERATURE),
-        PrinterSensor("bed_temp", "Bed Temperature", UnitOfTemperature.CELSIUS, SensorDeviceClass.TEMPERATURE),
-        PrinterSensor("chamber_temp", "Chamber Temperature", UnitOfTemperature.CELSIUS, SensorDeviceClass.TEMPERATURE),
-        PrinterSensor("progress", "Print Progress", PERCENTAGE),
-        PrinterSensor("time_left", "Time Remaining", UnitOfTime.SECONDS),
-        PrinterSensor("job_time", "Time Elapsed", UnitOfTime.SECONDS),
-        PrinterSensor("file", "Current File"),
-        PrinterSensor("state_text", "State"),
-        PrinterSensor("state_code", "State Code"),
-        PrinterSensor("layer", "Layer"),
-        PrinterSensor("total_layer", "Total Layers"),
+        PrinterSensor(client, dispatcher, printer_device, *spec) for spec in _PRINTER_SENSORS
     ]
     async_add_entities(printer_entities)
 
     # ------- DYNAMIC CFS SENSORS (only if boxsInfo exists) -------
     created_boxes: set[int] = set()
 
-    async def maybe_add_cfs_entities():
+    @callback
+    def maybe_add_cfs_entities():
         boxes = _cfs_boxes(client.state)
         new_entities: list[SensorEntity] = []
 
@@ -153,168 +292,36 @@ async def async_setup_entry(hass, entry, async_add_entities):
             if box_id in created_boxes:
                 continue
 
-            cfs_device = _cfs_device_info(entry_obj, client, box_id)
+            cfs_device = _cfs_device_info(entry_obj, client, data["urls"], box_id)
 
             # Overall CFS temp & humidity
-            class CFSTemp(SensorEntity):
-                _attr_has_entity_name = True
-                _attr_entity_registry_enabled_default = True
-                _attr_device_class = SensorDeviceClass.TEMPERATURE
-                _attr_native_unit_of_measurement = UnitOfTemperature.CELSIUS
-                def __init__(self, bid: int):
-                    self._bid = bid
-                    self._attr_name = "Temperature"
-                    self._attr_unique_id = f"{client.unique_id}_cfs_{bid}_temp"
-                    client.add_listener(self.schedule_update_ha_state)
-                @property
-                def device_info(self) -> DeviceInfo: return cfs_device
-                @property
-                def native_value(self):
-                    b = _cfs_box(client.state, self._bid)
-                    return None if not b else b.get("temp")
-
-            class CFSHumidity(SensorEntity):
-                _attr_has_entity_name = True
-                _attr_entity_registry_enabled_default = True
-                _attr_device_class = SensorDeviceClass.HUMIDITY
-                _attr_native_unit_of_measurement = PERCENTAGE
-                def __init__(self, bid: int):
-                    self._bid = bid
-                    self._attr_name = "Humidity"
-                    self._attr_unique_id = f"{client.unique_id}_cfs_{bid}_humidity"
-                    client.add_listener(self.schedule_update_ha_state)
-                @property
-                def device_info(self) -> DeviceInfo: return cfs_device
-                @property
-                def native_value(self):
-                    b = _cfs_box(client.state, self._bid)
-                    return None if not b else b.get("humidity")
-
-            new_entities += [CFSTemp(box_id), CFSHumidity(box_id)]
-
-            # Per-slot sensors (0..3): percent + extra fields type, color, name, min/max temp, selected, state
-            class CFSSlotBase(SensorEntity):
-                _attr_has_entity_name = True
-                _attr_entity_registry_enabled_default = True
-                def __init__(self, bid: int, sid: int, name_suffix: str, key: str = ""):
-                    self._bid = bid
-                    self._sid = sid
-                    self._key = key  # which field from slot dict
-                    self._attr_name = f"Slot {sid} {name_suffix}" if name_suffix else f"Slot {sid}"
-                    suff = key or name_suffix.replace(" ", "_").lower()
-                    self._attr_unique_id = f"{client.unique_id}_cfs_{bid}_slot_{sid}_{suff}"
-                    client.add_listener(self.schedule_update_ha_state)
-                @property
-                def device_info(self) -> DeviceInfo: return cfs_device
-                def _slot(self) -> Optional[Dict[str, Any]]:
-                    b = _cfs_box(client.state, self._bid)
-                    return _slot(b, self._sid) if b else None
-                @property
-                def extra_state_attributes(self):
-                    m = self._slot()
-                    if not m:
-                        return None
-                    return {
-                        "box_id": self._bid,
-                        "slot_id": self._sid,
-                        "name": m.get("name"),
-                        "vendor": m.get("vendor"),
-                        "type": m.get("type"),
-                        "color": _norm_color(m.get("color")),
-                        "percent": m.get("percent"),
-                        "state": m.get("state"),
-                        "selected": m.get("selected"),
-                        "min_temp": m.get("minTemp"),
-                        "max_temp": m.get("maxTemp"),
-                        "rfid": m.get("rfid"),
-                    }
-
-            class CFSSlotPercent(CFSSlotBase):
-                _attr_native_unit_of_measurement = PERCENTAGE
-                def __init__(self, bid: int, sid: int):
-                    super().__init__(bid, sid, "Percent", "percent")
-                @property
-                def native_value(self):
-                    m = self._slot()
-                    return None if not m else m.get("percent")
-
-            class CFSSlotType(CFSSlotBase):
-                def __init__(self, bid: int, sid: int):
-                    super().__init__(bid, sid, "Type", "type")
-                @property
-                def native_value(self):
-                    m = self._slot()
-                    return None if not m else m.get("type")
-
-            class CFSSlotName(CFSSlotBase):
-                def __init__(self, bid: int, sid: int):
-                    super().__init__(bid, sid, "Name", "name")
-                @property
-                def native_value(self):
-                    m = self._slot()
-                    return None if not m else m.get("name")
-
-            class CFSSlotColor(CFSSlotBase):
-                def __init__(self, bid: int, sid: int):
-                    super().__init__(bid, sid, "Color", "color")
-                @property
-                def native_value(self):
-                    m = self._slot()
-                    return None if not m else _norm_color(m.get("color"))
-
-            class CFSSlotSelected(CFSSlotBase):
-                def __init__(self, bid: int, sid: int):
-                    super().__init__(bid, sid, "Selected", "selected")
-                @property
-                def native_value(self):
-                    m = self._slot()
-                    return None if not m else m.get("selected")
-
-            class CFSSlotState(CFSSlotBase):
-                def __init__(self, bid: int, sid: int):
-                    super().__init__(bid, sid, "State", "state")
-                @property
-                def native_value(self):
-                    m = self._slot()
-                    return None if not m else m.get("state")
-
-            class CFSSlotMinTemp(CFSSlotBase):
-                _attr_device_class = SensorDeviceClass.TEMPERATURE
-                _attr_native_unit_of_measurement = UnitOfTemperature.CELSIUS
-                def __init__(self, bid: int, sid: int):
-                    super().__init__(bid, sid, "Min Temp", "minTemp")
-                @property
-                def native_value(self):
-                    m = self._slot()
-                    return None if not m else m.get("minTemp")
-
-            class CFSSlotMaxTemp(CFSSlotBase):
-                _attr_device_class = SensorDeviceClass.TEMPERATURE
-                _attr_native_unit_of_measurement = UnitOfTemperature.CELSIUS
-                def __init__(self, bid: int, sid: int):
-                    super().__init__(bid, sid, "Max Temp", "maxTemp")
-                @property
-                def native_value(self):
-                    m = self._slot()
-                    return None if not m else m.get("maxTemp")
+            new_entities += [
+                CFSTemp(client, dispatcher, cfs_device, box_id),
+                CFSHumidity(client, dispatcher, cfs_device, box_id),
+            ]
 
+            # Per-slot sensors (0..3), one per field in _SLOT_SPECS
             for sid in (0, 1, 2, 3):
-                new_entities.extend([
-                    CFSSlotPercent(box_id, sid),
-                    CFSSlotType(box_id, sid),
-                    CFSSlotName(box_id, sid),
-                    CFSSlotColor(box_id, sid),
-                    CFSSlotMinTemp(box_id, sid),
-                    CFSSlotMaxTemp(box_id, sid),
-                    CFSSlotSelected(box_id, sid),
-                    CFSSlotState(box_id, sid),
-                ])
+                for spec in _SLOT_SPECS:
+                    new_entities.append(CFSSlotSensor(client, dispatcher, cfs_device, box_id, sid, spec))
 
             created_boxes.add(box_id)
 
         if new_entities:
             async_add_entities(new_entities)
 
-    # Run once now (in case boxsInfo already present), and again whenever state updates
-    await maybe_add_cfs_entities()
-    client.add_listener(lambda: hass.async_create_task(maybe_add_cfs_entities()))
+    # Run once now (in case boxsInfo already present), then only when boxsInfo brings new boxes
+    maybe_add_cfs_entities()
+    last_box_ts = client.state["boxInfoTimeStamp"]
+
+    @callback
+    def _on_client_update():
+        nonlocal last_box_ts
+        ts = client.state["boxInfoTimeStamp"]
+        if ts == last_box_ts:
+            return
+        last_box_ts = ts
+        if client.state["_box_index"].keys() - created_boxes:
+            maybe_add_cfs_entities()
+
+    entry.async_on_unload(client.add_listener(_on_client_update))
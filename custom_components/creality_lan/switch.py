@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from homeassistant.components.switch import SwitchEntity
-from homeassistant.helpers.device_registry import DeviceInfo, CONNECTION_NETWORK_MAC
+from homeassistant.core import callback
 
 from .const import DOMAIN
 
@@ -9,30 +9,31 @@ from .const import DOMAIN
 async def async_setup_entry(hass, entry, async_add_entities):
     data = hass.data[DOMAIN][entry.entry_id]
     client = data["client"]
-    entry_obj = data["entry"]
-
-    device_info = DeviceInfo(
-        identifiers={(DOMAIN, client.unique_id)},
-        connections={(CONNECTION_NETWORK_MAC, client.mac)} if client.mac else None,
-        manufacturer="Creality",
-        model=client.model or "Creality Printer",
-        name=entry_obj.title,
-        configuration_url=f"http://{entry_obj.data['host']}:80",
-    )
+    dispatcher = data["dispatcher"]
+    device_info = await data["info_task"]
 
     class _BaseSwitch(SwitchEntity):
         _attr_has_entity_name = True
         _attr_entity_registry_enabled_default = True  # <- enabled by default
-
-        @property
-        def device_info(self) -> DeviceInfo:
-            return device_info
+        _attr_device_info = device_info
+        _attr_should_poll = False  # pushed from the websocket
+        _last_pushed = None
 
         @property
         def available(self) -> bool:
             # show as unavailable when offline (but not disabled)
             return bool(client.state.get("online"))
 
+        async def async_added_to_hass(self) -> None:
+            self.async_on_remove(dispatcher.add(self))
+
+        @callback
+        def _handle_client_update(self) -> None:
+            pushed = (self.is_on, self.available)
+            if pushed != self._last_pushed:
+                self._last_pushed = pushed
+                self.async_write_ha_state()
+
     class CrealityLight(_BaseSwitch):
         _attr_name = "Light"
         _attr_unique_id = f"{client.unique_id}_light"
@@ -5,19 +5,49 @@ import contextlib
 import json
 import logging
 import time
-from typing import Callable, Optional
+from typing import Any, Callable, Optional
 
 import aiohttp
 
-from .const import HEARTBEAT_SEC, RECONNECT_BACKOFF
+try:  # orjson ships with Home Assistant; fall back to stdlib json elsewhere
+    import orjson
+
+    _loads = orjson.loads
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+except ImportError:  # pragma: no cover
+    _loads = json.loads
+    _dumps = json.dumps
+
+from .const import (
+    CFS_CHANGE_WINDOW_SEC,
+    DEFAULT_CFS_POLL_FAST,
+    DEFAULT_CFS_POLL_SLOW,
+    HEARTBEAT_SEC,
+    RECONNECT_BACKOFF,
+)
+from .dispatcher import Registry
 
 _LOGGER = logging.getLogger(__name__)
 
+# Frames arriving within this window share a single listener fan-out
+_DISPATCH_DELAY = 0.05
+# Commands queued within this window are sent as one envelope
+_SEND_COALESCE_SEC = 0.03
+_INFO_TIMEOUT = aiohttp.ClientTimeout(total=6)
+
 
 class CrealityWS:
     """Creality LAN websocket client + state store for HA (ws://<ip>:9999/)."""
 
-    def __init__(self, host: str):
+    def __init__(
+        self,
+        host: str,
+        cfs_poll_fast: float = DEFAULT_CFS_POLL_FAST,
+        cfs_poll_slow: float = DEFAULT_CFS_POLL_SLOW,
+    ):
         self._host = host
         self._session: Optional[aiohttp.ClientSession] = None
         self._task: Optional[asyncio.Task] = None
@@ -35,6 +65,10 @@ class CrealityWS:
         self.cfs_supported: Optional[bool] = None  # None = unknown, True/False once determined
         self._cfs_probe: Optional[asyncio.Task] = None
         self._cfs_poller: Optional[asyncio.Task] = None
+        self._cfs_poll_fast = cfs_poll_fast
+        self._cfs_poll_slow = cfs_poll_slow
+        self._last_box_change = 0.0  # monotonic time boxsInfo content last changed
+        self._last_box_raw: Optional[str] = None
 
         # Shared state
         self.state = {
@@ -54,6 +88,7 @@ class CrealityWS:
             "printFileName": "",
             "deviceState": None,
             "state": None,
+            "printing": False,  # normalized from "state" on ingest
             "ctrol": {
                 "curFeedratePct": 100,
                 "fan": 0,
@@ -68,20 +103,32 @@ class CrealityWS:
             "previewimg": f"http://{host}:80/downloads/original/current_print_image.png",
             # CFS / boxsInfo (present only if device supports CFS)
             "boxsInfo": None,
+            # CFS boxes (type == 0) by id; each box carries "_slot_index" (slots by id)
+            "_box_index": {},
         }
 
-        self._listeners: list[Callable[[], None]] = []
+        self._listeners = Registry()
+        self._dispatch_handle: Optional[asyncio.TimerHandle] = None
+        self._tick_ts: Optional[int] = None  # ms timestamp shared by frames in one dispatch window
 
     # ---------- Public API ----------
 
-    def add_listener(self, cb: Callable[[], None]) -> None:
-        self._listeners.append(cb)
+    def add_listener(self, cb: Callable[[], None]) -> Callable[[], None]:
+        """Register a state-change callback; returns a function that removes it."""
+        return self._listeners.add(cb)
 
     async def async_start(self) -> None:
-        self._session = aiohttp.ClientSession()
+        # Fixed LAN IP: no DNS cache needed; WS + /info need only a few sockets
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=4, use_dns_cache=False),
+            json_serialize=_dumps,
+        )
         self._task = asyncio.create_task(self._runner())
 
     async def async_stop(self) -> None:
+        if self._dispatch_handle:
+            self._dispatch_handle.cancel()
+            self._dispatch_handle = None
         # cancel background tasks
         for t in (self._cfs_probe, self._cfs_poller):
             if t:
@@ -106,7 +153,7 @@ class CrealityWS:
         try:
             url = f"http://{self._host}:80/info"
             _LOGGER.debug("GET %s", url)
-            async with self._session.get(url, timeout=6) as r:
+            async with self._session.get(url, timeout=_INFO_TIMEOUT) as r:
                 if r.status == 200:
                     data = await r.json()
                     self.model = data.get("model")
@@ -141,13 +188,14 @@ class CrealityWS:
             try:
                 ws_url = f"ws://{self._host}:9999/"
                 _LOGGER.info("Connecting to %s", ws_url)
-                async with self._session.ws_connect(ws_url, timeout=10) as ws:
+                async with self._session.ws_connect(
+                    ws_url, timeout=10, heartbeat=HEARTBEAT_SEC  # aiohttp pings and watches pongs
+                ) as ws:
                     self._ws = ws
                     self.state["online"] = True
                     # reset CFS support on each (re)connect
                     self.cfs_supported = None
-                    for cb in self._listeners:
-                        cb()
+                    self._notify()
 
                     # tasks: rx/tx + an initial CFS probe loop
                     receiver = asyncio.create_task(self._recv_loop(ws))
@@ -165,8 +213,7 @@ class CrealityWS:
             except Exception as e:
                 _LOGGER.warning("WS disconnected (%s). Reconnecting…", e)
                 self.state["online"] = False
-                for cb in self._listeners:
-                    cb()
+                self._notify()
                 await asyncio.sleep(next(backoffs, RECONNECT_BACKOFF[-1]))
                 continue
             else:
@@ -200,115 +247,243 @@ class CrealityWS:
             return
         async def _loop():
             while True:
-                await asyncio.sleep(20)
+                # Poll quickly only while the boxes are actually changing
+                recent = time.monotonic() - self._last_box_change < CFS_CHANGE_WINDOW_SEC
+                await asyncio.sleep(self._cfs_poll_fast if recent else self._cfs_poll_slow)
                 await self.request_boxs_info()
         self._cfs_poller = asyncio.create_task(_loop())
 
     async def _recv_loop(self, ws: aiohttp.ClientWebSocketResponse):
-        last_ping = time.time()
+        last_raw: Optional[str] = None  # per connection
         async for msg in ws:
             if msg.type == aiohttp.WSMsgType.TEXT:
-                try:
-                    data = json.loads(msg.data)
-                    self._ingest(data)
-                    for cb in self._listeners:
-                        cb()
-                except Exception as e:
-                    _LOGGER.debug("Bad JSON from WS: %s", e)
+                # Heartbeat-style repeats change nothing: skip parse, ingest and dispatch
+                if msg.data != last_raw:
+                    last_raw = msg.data
+                    self._handle_text(msg.data)
             elif msg.type == aiohttp.WSMsgType.ERROR:
                 raise RuntimeError(f"WS error: {ws.exception()}")
 
-            # keepalive ping
-            if time.time() - last_ping > HEARTBEAT_SEC:
-                with contextlib.suppress(Exception):
-                    await ws.ping()
-                last_ping = time.time()
+    def _handle_text(self, raw: str) -> None:
+        try:
+            data = _loads(raw)
+            self._ingest(data)
+            self._notify()
+        except Exception as e:
+            _LOGGER.debug("Bad JSON from WS: %s", e)
 
     async def _send_loop(self, ws: aiohttp.ClientWebSocketResponse):
-        """Drain queued commands to the printer."""
+        """Drain queued commands to the printer, merging bursts into one frame."""
+        carry: Optional[dict] = None
         while not ws.closed:
-            envelope = await self._out_queue.get()
+            first = carry or await self._out_queue.get()
+            carry = None
+            method = first["method"]
+            params = dict(first["params"])
+            # Let a burst queue up, then fold consecutive same-method commands
+            # into one envelope (last write wins for repeated keys)
+            await asyncio.sleep(_SEND_COALESCE_SEC)
+            while True:
+                try:
+                    nxt = self._out_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if nxt["method"] != method:
+                    carry = nxt  # keep ordering: sent as the next envelope
+                    break
+                params.update(nxt["params"])
+            envelope = {"method": method, "params": params}
             try:
-                await ws.send_str(json.dumps(envelope))
+                await ws.send_str(_dumps(envelope))
                 _LOGGER.debug("WS -> %s", envelope)
             except Exception as e:
                 _LOGGER.debug("Failed to send WS cmd: %s", e)
 
-    # ---------- Ingestion helpers ----------
+    # ---------- Listener dispatch ----------
 
-    @staticmethod
-    def _num(x, default=0.0):
-        try:
-            return float(x)
-        except Exception:
+    def _notify(self) -> None:
+        """Mark state dirty; listeners run once per dispatch window, not per frame."""
+        if self._dispatch_handle is None:
+            self._dispatch_handle = asyncio.get_running_loop().call_later(
+                _DISPATCH_DELAY, self._flush
+            )
+
+    def _flush(self) -> None:
+        self._dispatch_handle = None
+        self._tick_ts = None
+        # One failing listener must not starve the rest
+        for cb in self._listeners.items:
             try:
-                return int(x)
+                cb()
             except Exception:
-                return default
+                _LOGGER.debug("Listener %s failed", cb, exc_info=True)
+
+    # ---------- Ingestion helpers ----------
+
+    def _index_boxes(self, info) -> None:
+        """Rebuild the id lookups over boxsInfo so readers avoid linear scans."""
+        idx = {}
+        boxes = info.get("materialBoxs") if isinstance(info, dict) else None
+        if not isinstance(boxes, list):
+            boxes = []
+        for b in boxes:
+            if not isinstance(b, dict):
+                continue
+            if b.get("type") == 0 and isinstance(b.get("id"), int):
+                slots = {}
+                materials = b.get("materials")
+                for m in materials if isinstance(materials, list) else ():
+                    if not isinstance(m, dict) or not isinstance(m.get("id"), int):
+                        continue
+                    # Derived once here instead of on every sensor read
+                    m["_color_norm"] = _norm_color(m.get("color"))
+                    attrs = {"box_id": b["id"], "slot_id": m["id"]}
+                    for out_key, in_key in _SLOT_ATTR_KEYS:
+                        attrs[out_key] = m.get(in_key)
+                    m["_attrs"] = attrs
+                    slots[m["id"]] = m
+                b["_slot_index"] = slots
+                idx[b["id"]] = b
+        self.state["_box_index"] = idx
+
+    def _ingest_boxs_info(self, info) -> None:
+        s = self.state
+        # Fingerprint before indexing adds derived keys to the dicts
+        raw = _dumps(info)
+        if raw != self._last_box_raw:
+            self._last_box_raw = raw
+            self._last_box_change = time.monotonic()
+        s["boxsInfo"] = info
+        s["boxInfoTimeStamp"] = s["timeStamp"]
+        self._index_boxes(info)
+        if self.cfs_supported is None:
+            self.cfs_supported = True
+            _LOGGER.info("CFS detected; starting periodic polling.")
+            # kick off poller
+            asyncio.create_task(self._start_cfs_poller())
 
     def _ingest(self, r: dict):
         s = self.state
-        s["timeStamp"] = int(time.time() * 1000)
-
-        # Whole CFS object
-        if "boxsInfo" in r:
-            s["boxsInfo"] = r["boxsInfo"]
-            s["boxInfoTimeStamp"] = s["timeStamp"]
-            if self.cfs_supported is None:
-                self.cfs_supported = True
-                _LOGGER.info("CFS detected; starting periodic polling.")
-                # kick off poller
-                asyncio.create_task(self._start_cfs_poller())
-
-        # Direct copies (with light normalization)
-        if "printProgress" in r:
-            s["printProgress"] = int(r["printProgress"])
-        if "printLeftTime" in r:
-            s["printLeftTime"] = int(self._num(r["printLeftTime"], 0))
-        if "printJobTime" in r:
-            s["printJobTime"] = int(self._num(r["printJobTime"], 0))
-        if "printFileName" in r:
-            s["printFileName"] = str(r["printFileName"]).split("/")[-1]
-        if "deviceState" in r:
-            s["deviceState"] = r["deviceState"]
-        if "state" in r:
-            s["state"] = r["state"]
-
-        # Temperatures
-        if "nozzleTemp" in r:
-            s["temperature"]["nozzle"]["value"] = self._num(r["nozzleTemp"], 0.0)
-        if "bedTemp0" in r:
-            s["temperature"]["bed"]["value"] = self._num(r["bedTemp0"], 0.0)
-        if "boxTemp" in r:
-            s["temperature"]["box"]["value"] = self._num(r["boxTemp"], 0.0)
-
-        if "targetNozzleTemp" in r:
-            s["temperature"]["nozzle"]["target"] = self._num(r["targetNozzleTemp"], 0.0)
-        if "targetBedTemp0" in r:
-            s["temperature"]["bed"]["target"] = self._num(r["targetBedTemp0"], 0.0)
-        if "maxNozzleTemp" in r:
-            s["temperature"]["nozzle"]["max"] = self._num(r["maxNozzleTemp"], 350.0)
-        if "maxBedTemp" in r:
-            s["temperature"]["bed"]["max"] = self._num(r["maxBedTemp"], 120.0)
-
-        # Controls/fans/lights
-        for k in (
-            "curFeedratePct",
-            "fan",
-            "modelFanPct",
-            "auxiliaryFanPct",
-            "caseFanPct",
-            "lightSw",
-            "fanAuxiliary",
-            "fanCase",
-        ):
-            if k in r:
-                s["ctrol"][k] = r[k]
-
-        # Errors
-        if "err" in r and isinstance(r["err"], dict):
-            s["err"] = r["err"]
-
-        # Keep raw data for debugging
+        # No flush pending means a new window, even if the last frame failed before _notify
+        if self._tick_ts is None or self._dispatch_handle is None:
+            self._tick_ts = time.time_ns() // 1_000_000
+        s["timeStamp"] = self._tick_ts
+
+        # Only the keys present in this frame are visited
         for k, v in r.items():
-            s["data"][k] = v
+            handler = _INGEST.get(k)
+            if handler:
+                handler(self, s, v)
+
+        # Keep the latest raw frame for debugging only
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            s["data"] = r
+
+
+def _norm_color(c: Optional[str]) -> Optional[str]:
+    if not c:
+        return None
+    # Normalize things like "0ffffff", "0000000", "#09ea7ae" → "#ffffff" style 7-chars is odd, but we’ll best-effort.
+    s = str(c).strip()
+    if s.startswith("#"):
+        return s
+    # If it looks like 7 chars starting with 0, keep it but add "#"
+    if len(s) in (6, 7, 8):
+        return "#" + s[-6:]
+    return s
+
+
+# Slot attributes exposed on CFS slot sensors: (attribute, slot dict key)
+_SLOT_ATTR_KEYS = (
+    ("name", "name"),
+    ("vendor", "vendor"),
+    ("type", "type"),
+    ("color", "_color_norm"),
+    ("percent", "percent"),
+    ("state", "state"),
+    ("selected", "selected"),
+    ("min_temp", "minTemp"),
+    ("max_temp", "maxTemp"),
+    ("rfid", "rfid"),
+)
+
+
+# ---------- Ingestion table: frame key -> handler(client, state, value) ----------
+
+def _num(x, default=0.0):
+    try:
+        return float(x)
+    except Exception:
+        try:
+            return int(x)
+        except Exception:
+            return default
+
+
+def _copy(key: str, conv: Optional[Callable[[Any], Any]] = None):
+    """Store the value under the same key in state, optionally converted."""
+    if conv is None:
+        def _set(client, s, v):
+            s[key] = v
+    else:
+        def _set(client, s, v):
+            s[key] = conv(v)
+    return _set
+
+
+def _temp(sensor: str, field: str, default: float):
+    def _set(client, s, v):
+        s["temperature"][sensor][field] = _num(v, default)
+    return _set
+
+
+def _ctrol(key: str):
+    def _set(client, s, v):
+        s["ctrol"][key] = v
+    return _set
+
+
+def _set_state(client, s, v):
+    s["state"] = v
+    s["printing"] = v == 1 or (isinstance(v, str) and v.lower() == "printing")
+
+
+def _set_err(client, s, v):
+    if isinstance(v, dict):
+        s["err"] = v
+
+
+_INGEST: dict[str, Callable[[CrealityWS, dict, Any], None]] = {
+    # Whole CFS object
+    "boxsInfo": lambda client, s, v: client._ingest_boxs_info(v),
+    # Direct copies (with light normalization)
+    "printProgress": _copy("printProgress", int),
+    "printLeftTime": _copy("printLeftTime", lambda v: int(_num(v, 0))),
+    "printJobTime": _copy("printJobTime", lambda v: int(_num(v, 0))),
+    "printFileName": _copy("printFileName", lambda v: str(v).split("/")[-1]),
+    "deviceState": _copy("deviceState"),
+    "state": _set_state,
+    # Temperatures
+    "nozzleTemp": _temp("nozzle", "value", 0.0),
+    "bedTemp0": _temp("bed", "value", 0.0),
+    "boxTemp": _temp("box", "value", 0.0),
+    "targetNozzleTemp": _temp("nozzle", "target", 0.0),
+    "targetBedTemp0": _temp("bed", "target", 0.0),
+    "maxNozzleTemp": _temp("nozzle", "max", 350.0),
+    "maxBedTemp": _temp("bed", "max", 120.0),
+    # Errors
+    "err": _set_err,
+}
+# Controls/fans/lights
+for _k in (
+    "curFeedratePct",
+    "fan",
+    "modelFanPct",
+    "auxiliaryFanPct",
+    "caseFanPct",
+    "lightSw",
+    "fanAuxiliary",
+    "fanCase",
+):
+    _INGEST[_k] = _ctrol(_k)
+del _k